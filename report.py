@@ -2,11 +2,24 @@
 
 import datetime
 import glob
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 import pandas as pd
 import yfinance as yf
 
+from tools import (
+    SCREENER_HORIZON,
+    equity_curve,
+    equity_metrics,
+    exit_outcomes,
+    shift_sessions,
+    stack_bars,
+    validate_bars,
+)
+
+# symbols without flagged bars
+NO_ISSUES = pd.Series(dtype=str, index=pd.DatetimeIndex([]))
+
 
 def load_screener() -> pd.DataFrame:
     screener = []
@@ -19,46 +32,51 @@ def load_screener() -> pd.DataFrame:
     return pd.concat(screener)
 
 
-def get_stocks(symbols: List[str]) -> Dict[str, pd.DataFrame]:
-    """_summary_
+def get_stocks(symbols: List[str]) -> Tuple[Dict[str, pd.DataFrame], pd.Series]:
+    """
+    Load the stock data of the symbols from yahoo and validate them at once.
 
     Args:
-        symbols (List[str]): _description_
+        symbols (List[str]): List of stock symbols
 
     Returns:
-        Dict[str, pd.DataFrame]: _description_
+        Tuple[Dict[str, pd.DataFrame], pd.Series]: stock data by symbol and
+            the failed checks of every flagged bar
     """
 
-    dfs = {}
     stock_data = yf.download(
         symbols,
         rounding=2,
         progress=False,
         group_by="ticker",
+        actions=True,
     )
 
-    # perform some pre preparation
-    for symbol in stock_data.columns.get_level_values(0).unique():
-        # drop unclear items
-        df = stock_data[symbol]
-        df = df[~(df.High == df.Low)]
-        df = df.dropna()
-        df.index = pd.to_datetime(df.index)
+    dfs, findings, issues = validate_bars(stack_bars(stock_data))
+    if len(findings):
+        print(findings)
 
-        dfs[symbol.lower()] = df
-
-    return dfs
+    return dfs, issues
 
 
 def main():
     screener = load_screener()
-    dfs = get_stocks(symbols=screener.symbol.unique().tolist())
+    dfs, issues = get_stocks(symbols=screener.symbol.unique().tolist())
+    issues = {
+        symbol: bars.droplevel("symbol")
+        for symbol, bars in issues.groupby(level="symbol")
+    }
+
+    # last trading day of the holding period, independent of gaps in the bars
+    screener["end"] = shift_sessions(screener["date"], SCREENER_HORIZON - 1)
 
     export_list = []
 
     for _, row in screener.iterrows():
-        df = dfs[row["symbol"]][row["date"] :]
-        df = df[:5]
+        # symbols without any valid bar are kept without a trade
+        stock = dfs.get(row["symbol"], pd.DataFrame(index=pd.DatetimeIndex([])))
+        df = stock[row["date"] : row["end"]]
+        incomplete = len(stock) == 0 or row["end"] > stock.index[-1]
         trade = {}
         trade["date"] = row["date"]
         try:
@@ -72,6 +90,12 @@ def main():
         trade["sl"] = row["sl"]
         trade["tp"] = row["tp"]
         trade["risk"] = abs(row["kk"] - row["sl"])
+        # trades are evaluated anyway, but marked with the failed checks of
+        # the bars within their own holding period
+        window = issues.get(row["symbol"], NO_ISSUES)[row["date"] : row["end"]]
+        trade["issues"] = ", ".join(
+            sorted({check for bar in window for check in bar.split(", ")})
+        )
 
         if row["direction"] == "LONG" and len(df) > 0:
             if df.iloc[0].High > row["kk"]:
@@ -93,7 +117,7 @@ def main():
                     tp = 99
                     sl = 99
 
-                if len(df) < 5:
+                if incomplete:
                     trade["status"] = "-"
                     trade["duration"] = len(df)
                     trade["r"] = (df.iloc[-1].Close - trade["entry"]) / trade["risk"]
@@ -135,7 +159,7 @@ def main():
                     tp = 99
                     sl = 99
 
-                if len(df) < 5:
+                if incomplete:
                     trade["status"] = "-"
                     trade["duration"] = len(df)
                     trade["r"] = (trade["entry"] - df.iloc[-1].Close) / trade["risk"]
@@ -173,6 +197,28 @@ def main():
         f"./data/report/{datetime.datetime.now():%Y-%m-%d}.csv", index=False
     )
 
+    # evaluate all exit policies at once for the historical signals
+    signals = screener.sort_values(by="date").drop_duplicates(
+        subset=["symbol", "signal-date"], keep="last"
+    )
+    outcomes = exit_outcomes(signals, dfs)
+    outcomes.to_parquet("./data/report/outcomes.parquet", index=False)
+
+    summary = pd.concat(
+        [
+            equity_metrics(outcomes),
+            equity_metrics(outcomes, by=["direction"]),
+            equity_metrics(outcomes, by=["industry"]),
+        ],
+        ignore_index=True,
+    )
+    summary.to_parquet("./data/report/summary.parquet", index=False)
+
+    # equity curve of the exit policy used by the screener
+    equity_curve(outcomes).rename("equity").reset_index().to_parquet(
+        "./data/report/equity.parquet", index=False
+    )
+
 
 if __name__ == "__main__":
     main()
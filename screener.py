@@ -3,13 +3,30 @@
 import datetime
 import os
 import pickle
-from typing import Dict, List
+from typing import Dict, List, Tuple
 
 import pandas as pd
 import yfinance as yf
 from pandas_ta import adx
 
-from tools import atr, doji, get_symbols_with_earnings, resample_week, roc, sma
+from tools import (
+    SCREENER_SL_ATR,
+    SCREENER_TP_ATR,
+    align,
+    atr,
+    doji,
+    get_symbols_with_earnings,
+    missing_bars,
+    option_expiration_days,
+    resample_week,
+    roc,
+    sma,
+    stack_bars,
+    validate_bars,
+)
+
+# trading days, which must be complete for the indicators
+INDICATOR_WINDOW: int = 20
 
 
 def get_symbols() -> List[str]:
@@ -36,18 +53,21 @@ def get_symbols() -> List[str]:
     return symbols
 
 
-def get_stocks(symbols: List[str]) -> Dict[str, pd.DataFrame]:
-    """_summary_
+def get_stocks(symbols: List[str]) -> Tuple[Dict[str, pd.DataFrame], pd.DataFrame]:
+    """
+    Load the stock data of all symbols from yahoo, at most every 12h, and
+    validate them at once.
 
     Args:
-        symbols (List[str]): _description_
+        symbols (List[str]): List of stock symbols
 
     Returns:
-        Dict[str, pd.DataFrame]: _description_
+        Tuple[Dict[str, pd.DataFrame], pd.DataFrame]: stock data by symbol
+            and the findings of the validation
     """
 
-    filename: str = "yahoo.pkl"
-    dfs = {}
+    # the version avoids loading a cache of an older format
+    filename: str = "yahoo_v2.pkl"
     try:
         # delete stock data of older than 12h
         file_time = os.path.getmtime(filename)
@@ -57,43 +77,30 @@ def get_stocks(symbols: List[str]) -> Dict[str, pd.DataFrame]:
 
         # use current stock data
         with open(filename, "rb") as file:
-            dfs = pickle.load(file)
+            dfs, findings = pickle.load(file)
 
     except FileNotFoundError:
         # in case no stock data exists, load them from yahoo
+        bars = []
         for _, group in symbols.groupby(symbols.symbol.str[0]):
             stock_data = yf.download(
                 group.symbol.values.tolist(),
                 rounding=2,
                 progress=False,
                 group_by="ticker",
+                actions=True,
             )
+            bars.append(stack_bars(stock_data))
 
-            # perform some pre preparation
-            for symbol in stock_data.columns.get_level_values(0).unique():
-                # drop unclear items
-                df = stock_data[symbol]
-                df = df[~(df.High == df.Low)]
-                df = df.dropna()
-                df.index = pd.to_datetime(df.index)
-
-                if len(df) > 0:
-                    dfs[symbol.lower()] = df
+        # validate the whole universe at once
+        dfs, findings, _ = validate_bars(pd.concat(bars))
+        if len(findings):
+            print(findings)
 
         # save the current stock data for later activities
         with open(filename, "wb") as file:
-            pickle.dump(dfs, file)
-    return dfs
-
-
-def triple_witching_day() -> str:
-    today = datetime.date.today()
-    first_day = datetime.date(today.year, int(today.month / 4) + 3, 1)
-    offset = (first_day.weekday() - 4) % 7
-    last_friday = (first_day + datetime.timedelta(days=3 * 7 + offset)).strftime(
-        "%Y-%m-%d"
-    )
-    return last_friday
+            pickle.dump((dfs, findings), file)
+    return dfs, findings
 
 
 def get_symbol_metadata(symbol: str) -> Dict[str, str]:
@@ -118,12 +125,21 @@ def main():
     export_list = []
 
     # update the stock data for the screening process
-    dfs = get_stocks(symbols=get_symbols())
+    dfs, findings = get_stocks(symbols=get_symbols())
 
     # update stocklist with valid symbols
     pd.DataFrame(dfs.keys(), columns=["symbol"]).to_pickle("stocks.pkl")
 
-    for symbol in dfs.keys():
+    # skip quarantined symbols, symbols without a bar for the last session
+    # or with gaps in the recent bars, as all of them distort the indicators
+    closes = align(dfs, sessions=INDICATOR_WINDOW)
+    valid = closes.iloc[-1].notna() & ~missing_bars(closes).any()
+    valid &= ~valid.index.isin(findings[findings.quarantined].index)
+    symbols = valid[valid].index
+
+    opex = option_expiration_days()
+
+    for symbol in symbols:
         df = dfs[symbol.lower()]["2020-01-01":].copy()
         df_week = resample_week(df.copy())
 
@@ -176,14 +192,14 @@ def main():
         df["sma_200"] = sma(df.Close, 200) / df.Close
 
         df["down_volume"] = (
-            df[(df.Close < df.sma_3) & (df.index != triple_witching_day())]
+            df[(df.Close < df.sma_3) & ~df.index.isin(opex)]
             .Volume.dropna()
             .rolling(5)
             .mean()
             .reindex(df.index, method="pad")
         )
         df["up_volume"] = (
-            df[(df.Close > df.sma_3) & (df.index != triple_witching_day())]
+            df[(df.Close > df.sma_3) & ~df.index.isin(opex)]
             .Volume.dropna()
             .rolling(5)
             .mean()
@@ -201,7 +217,7 @@ def main():
             day["doji"] is False,
             day["Close"] < day["Open"],
             not ((day["prev_High"] < day["High"]) and (day["prev_doji"] is False)),
-            day["atr_distance_high_8"] > 1.8,
+            day["atr_distance_high_8"] > SCREENER_TP_ATR,
             day["atr_distance_low_3"] < 1.5,
             day["up_volume"] > day["down_volume"],
             day["roc_60"] > 0,
@@ -227,13 +243,16 @@ def main():
                         "symbol": symbol,
                         "signal-date": df.iloc[-1].name.strftime("%Y-%m-%d"),
                         "kk": round(day["High"] + max(0.001 * day["Low"], 0.02), 2),
-                        "sl": round(day["High"] - 0.9 * day["atr_10"], 2),
-                        "tp": round(day["High"] + 1.8 * day["atr_10"], 2),
+                        "sl": round(day["High"] - SCREENER_SL_ATR * day["atr_10"], 2),
+                        "tp": round(day["High"] + SCREENER_TP_ATR * day["atr_10"], 2),
+                        "atr_10": round(day["atr_10"], 2),
                         "qty": int(
                             100
                             / abs(
                                 round(day["Low"] - max(0.001 * day["Low"], 0.02), 2)
-                                - round(day["Low"] + 0.9 * day["atr_10"], 2)
+                                - round(
+                                    day["Low"] + SCREENER_SL_ATR * day["atr_10"], 2
+                                )
                             )
                         ),
                         "distance_tp_atr": round(day["atr_distance_high_8"], 1),
@@ -252,7 +271,7 @@ def main():
             day["doji"] is False,
             day["Close"] > day["Open"],
             not ((day["prev_Low"] > day["Low"]) and (day["prev_doji"] is False)),
-            day["atr_distance_low_8"] > 1.8,
+            day["atr_distance_low_8"] > SCREENER_TP_ATR,
             day["atr_distance_high_3"] < 1.5,
             day["up_volume"] < day["down_volume"],
             day["roc_60"] < -1,
@@ -277,13 +296,16 @@ def main():
                         "symbol": symbol,
                         "signal-date": df.iloc[-1].name.strftime("%Y-%m-%d"),
                         "kk": round(day["Low"] - max(0.001 * day["Low"], 0.02), 2),
-                        "sl": round(day["Low"] + 0.9 * day["atr_10"], 2),
-                        "tp": round(day["Low"] - 1.8 * day["atr_10"], 2),
+                        "sl": round(day["Low"] + SCREENER_SL_ATR * day["atr_10"], 2),
+                        "tp": round(day["Low"] - SCREENER_TP_ATR * day["atr_10"], 2),
+                        "atr_10": round(day["atr_10"], 2),
                         "qty": int(
                             100
                             / abs(
                                 round(day["Low"] - max(0.001 * day["Low"], 0.02), 2)
-                                - round(day["Low"] + 0.9 * day["atr_10"], 2)
+                                - round(
+                                    day["Low"] + SCREENER_SL_ATR * day["atr_10"], 2
+                                )
                             )
                         ),
                         "distance_tp_atr": round(day["atr_distance_low_8"], 1),
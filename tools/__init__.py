@@ -1,5 +1,8 @@
 __version__ = "0.0.1"
 
+from .analytics import *
 from .calc import *
 from .candle import *
 from .earnings import *
+from .trading_calendar import *
+from .validation import *
@@ -0,0 +1,189 @@
+"""Exit Analytics for all historical Signals of the Screener"""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .trading_calendar import align, shift_sessions
+
+# grid of the exit policies, the screener itself uses 5 bars, 0.9 and 1.8 ATR
+HORIZONS: List[int] = [1, 2, 3, 5, 8, 10, 15, 20]
+SL_ATR: List[float] = [0.5, 0.7, 0.9, 1.2, 1.5, 2.0]
+TP_ATR: List[float] = [0.9, 1.2, 1.5, 1.8, 2.4, 3.0, 4.0]
+
+# exit policy of the screener, used by screener and report
+SCREENER_HORIZON: int = 5
+SCREENER_SL_ATR: float = 0.9
+SCREENER_TP_ATR: float = 1.8
+
+
+def forward_windows(
+    signals: pd.DataFrame, dfs: Dict[str, pd.DataFrame], horizon: int
+) -> Dict[str, np.ndarray]:
+    """
+    Price windows of all signals, starting with the session after the
+    signal-date. Bars after the end of the data are NaN.
+
+    Args:
+        signals (pd.DataFrame): signals with symbol and signal-date
+        dfs (Dict[str, pd.DataFrame]): stock data by symbol
+        horizon (int): number of bars per window
+
+    Returns:
+        Dict[str, np.ndarray]: Open, High, Low, Close of shape (signals, horizon)
+    """
+    dfs = {symbol: dfs[symbol] for symbol in signals.symbol.unique() if symbol in dfs}
+    entry = shift_sessions(pd.to_datetime(signals["signal-date"]), 1)
+
+    windows = {}
+    for column in ["Open", "High", "Low", "Close"]:
+        panel = align(dfs, column)
+        prices = panel.to_numpy(dtype=float)
+        prices = np.vstack([prices, np.full((horizon, prices.shape[1]), np.nan)])
+
+        rows = np.searchsorted(panel.index, entry)[:, None] + np.arange(horizon)
+        rows = np.minimum(rows, len(prices) - 1)
+        cols = panel.columns.get_indexer(signals.symbol)
+        window = prices[rows, cols[:, None]]
+        window[cols < 0] = np.nan
+        windows[column] = window
+
+    return windows
+
+
+def exit_outcomes(
+    signals: pd.DataFrame,
+    dfs: Dict[str, pd.DataFrame],
+    horizons: Sequence[int] = HORIZONS,
+    sl_atr: Sequence[float] = SL_ATR,
+    tp_atr: Sequence[float] = TP_ATR,
+) -> pd.DataFrame:
+    """
+    Result in R of every signal for each holding period and SL/TP multiple.
+    The trade is entered like in the report, at the entry bar the TP must
+    not be reached. SL and TP are checked from the second bar on, if both
+    are hit by the same bar the SL is taken. Without a hit the trade is
+    closed at the last bar of the holding period.
+
+    Args:
+        signals (pd.DataFrame): signals of the screener
+        dfs (Dict[str, pd.DataFrame]): stock data by symbol
+        horizons (Sequence[int], optional): holding periods in bars.
+        sl_atr (Sequence[float], optional): SL distances in ATR.
+        tp_atr (Sequence[float], optional): TP distances in ATR.
+
+    Returns:
+        pd.DataFrame: one row per signal, holding period, SL and TP
+    """
+    horizons = np.asarray(horizons)
+    sl_atr = np.asarray(sl_atr, dtype=float)
+    tp_atr = np.asarray(tp_atr, dtype=float)
+    windows = forward_windows(signals, dfs, int(horizons.max()))
+
+    # mirror shorts, so all trades can be evaluated like longs
+    side = np.where(signals.direction == "LONG", 1.0, -1.0)[:, None]
+    favorable = np.where(side > 0, windows["High"], -windows["Low"])
+    adverse = np.where(side > 0, windows["Low"], -windows["High"])
+    close = windows["Close"] * side
+    kk = signals.kk.to_numpy()[:, None] * side
+
+    # older screener files have no ATR, it is recovered from SL and TP
+    atr = abs(signals.tp - signals.sl) / (SCREENER_SL_ATR + SCREENER_TP_ATR)
+    if "atr_10" in signals:
+        atr = signals.atr_10.fillna(atr)
+    atr = atr.to_numpy()[:, None]
+    ref = signals.tp.to_numpy()[:, None] * side - SCREENER_TP_ATR * atr
+    sl = ref - sl_atr * atr
+    tp = ref + tp_atr * atr
+
+    triggered = favorable[:, :1] > kk
+    entry = np.maximum(windows["Open"][:, :1] * side, kk)
+
+    # first bar, which reaches TP or SL, the window length if never
+    never = favorable.shape[1]
+    tp_hit = favorable[:, 1:, None] > tp[:, None, :]
+    sl_hit = adverse[:, 1:, None] < sl[:, None, :]
+    first_tp = np.where(tp_hit.any(axis=1), tp_hit.argmax(axis=1) + 1, never)
+    first_sl = np.where(sl_hit.any(axis=1), sl_hit.argmax(axis=1) + 1, never)
+
+    # broadcast to (signals, horizons, sl, tp)
+    bars = horizons[None, :, None, None]
+    first_tp = first_tp[:, None, None, :]
+    first_sl = first_sl[:, None, :, None]
+    sl_exit = (first_sl < bars) & (first_sl <= first_tp)
+    tp_exit = (first_tp < bars) & (first_tp < first_sl)
+    exit_price = np.where(
+        sl_exit,
+        sl[:, None, :, None],
+        np.where(tp_exit, tp[:, None, None, :], close[:, horizons - 1, None, None]),
+    )
+
+    risk = (kk - sl)[:, None, :, None]
+    r = (exit_price - entry[:, :, None, None]) / risk
+    valid = triggered[:, :, None, None] & ~(favorable[:, :1] > tp)[:, None, None, :]
+    r = np.where(valid, r, np.nan)
+
+    index = pd.MultiIndex.from_product(
+        [range(len(signals)), horizons, sl_atr, tp_atr],
+        names=["signal", "horizon", "sl_atr", "tp_atr"],
+    )
+    outcomes = pd.DataFrame(
+        {
+            "r": r.ravel(),
+            "status": np.select(
+                [sl_exit.ravel(), tp_exit.ravel()], ["SL", "TP"], "TE"
+            ),
+        },
+        index=index,
+    )
+    outcomes = outcomes.dropna(subset=["r"]).reset_index()
+
+    meta = signals[["signal-date", "symbol", "direction", "industry"]]
+    return outcomes.join(meta.reset_index(drop=True), on="signal").drop(
+        columns="signal"
+    )
+
+
+def equity_metrics(outcomes: pd.DataFrame, by: List[str] = None) -> pd.DataFrame:
+    """
+    Equity metrics of every exit policy, optionally broken down by columns.
+
+    Args:
+        outcomes (pd.DataFrame): result of exit_outcomes()
+        by (List[str], optional): additional group columns. Defaults to None.
+
+    Returns:
+        pd.DataFrame: trades, win_rate, expectancy, r_sum and max_drawdown
+    """
+    keys = ["horizon", "sl_atr", "tp_atr"] + (by or [])
+    df = outcomes.sort_values(by="signal-date", kind="stable")
+
+    grouped = df.groupby(keys, sort=False).r
+    equity = grouped.cumsum()
+    peak = equity.groupby([df[key] for key in keys], sort=False).cummax().clip(lower=0)
+    df = df.assign(drawdown=peak - equity, win=df.r > 0)
+
+    metrics = df.groupby(keys).agg(
+        trades=("r", "count"),
+        win_rate=("win", "mean"),
+        expectancy=("r", "mean"),
+        r_sum=("r", "sum"),
+        max_drawdown=("drawdown", "max"),
+    )
+    return metrics.round(3).reset_index()
+
+
+def equity_curve(
+    outcomes: pd.DataFrame,
+    horizon: int = SCREENER_HORIZON,
+    sl_atr: float = SCREENER_SL_ATR,
+    tp_atr: float = SCREENER_TP_ATR,
+) -> pd.Series:
+    """Cumulated R of one exit policy by signal-date, defaults to the screener"""
+    df = outcomes[
+        (outcomes.horizon == horizon)
+        & (outcomes.sl_atr == sl_atr)
+        & (outcomes.tp_atr == tp_atr)
+    ]
+    return df.groupby("signal-date").r.sum().cumsum()
@@ -3,6 +3,8 @@
 import numpy as np
 import pandas as pd
 
+from .trading_calendar import trading_calendar, week_bucket
+
 
 def atr(df: pd.DataFrame, intervall: int = 14, smoothing: str = "sma") -> pd.Series:
     # Ref: https://stackoverflow.com/a/74282809/
@@ -25,7 +27,10 @@ def resample_week(df: pd.DataFrame) -> pd.DataFrame:
     # expected columns Date, Open, High, Low, Close
 
     df["Date"] = df.index
-    df["week"] = df["Date"].dt.strftime("%y-%W")
+    # week of the cached calendar, bars outside of it fall back to the same id
+    week = trading_calendar().week.reindex(df.index)
+    fallback = pd.Series(week_bucket(df.index), index=df.index)
+    df["week"] = week.fillna(fallback).astype(int)
 
     df = df.groupby("week").agg(
         Date=("Date", "last"),
@@ -0,0 +1,207 @@
+"""NYSE Trading Calendar shared by Screener and Report"""
+
+from functools import lru_cache
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.holiday import (
+    AbstractHolidayCalendar,
+    GoodFriday,
+    Holiday,
+    USLaborDay,
+    USMartinLutherKingJr,
+    USMemorialDay,
+    USPresidentsDay,
+    USThanksgivingDay,
+    nearest_workday,
+    sunday_to_monday,
+)
+from pandas.tseries.offsets import CustomBusinessDay
+
+CALENDAR_START: str = "2000-01-01"
+
+# unscheduled full day closures of the exchange
+SPECIAL_CLOSURES = [
+    "2001-09-11",
+    "2001-09-12",
+    "2001-09-13",
+    "2001-09-14",
+    "2004-06-11",
+    "2007-01-02",
+    "2012-10-29",
+    "2012-10-30",
+    "2018-12-05",
+    "2025-01-09",
+]
+
+
+class NYSEHolidayCalendar(AbstractHolidayCalendar):
+    """
+    Regular holidays of the NYSE. A New Year's Day on a saturday is not
+    moved to the friday before, all other holidays use the nearest workday.
+    """
+
+    rules = [
+        Holiday("NewYearsDay", month=1, day=1, observance=sunday_to_monday),
+        USMartinLutherKingJr,
+        USPresidentsDay,
+        GoodFriday,
+        USMemorialDay,
+        Holiday(
+            "Juneteenth",
+            month=6,
+            day=19,
+            start_date="2022-06-19",
+            observance=nearest_workday,
+        ),
+        Holiday("IndependenceDay", month=7, day=4, observance=nearest_workday),
+        USLaborDay,
+        USThanksgivingDay,
+        Holiday("Christmas", month=12, day=25, observance=nearest_workday),
+    ]
+
+
+def _calendar_end() -> pd.Timestamp:
+    # cover the running and the following year for forward looking windows
+    return pd.Timestamp(year=pd.Timestamp.today().year + 1, month=12, day=31)
+
+
+@lru_cache(maxsize=None)
+def nyse_holidays(start: str = CALENDAR_START, end: str = None) -> pd.DatetimeIndex:
+    """
+    Regular and special closures of the NYSE between start and end.
+
+    Args:
+        start (str, optional): first date. Defaults to CALENDAR_START.
+        end (str, optional): last date. Defaults to the end of next year.
+
+    Returns:
+        pd.DatetimeIndex: sorted closure dates
+    """
+    end = pd.Timestamp(end) if end else _calendar_end()
+    holidays = NYSEHolidayCalendar().holidays(start=start, end=end)
+    special = pd.DatetimeIndex(SPECIAL_CLOSURES)
+    special = special[(special >= pd.Timestamp(start)) & (special <= end)]
+    return holidays.union(special)
+
+
+@lru_cache(maxsize=None)
+def trading_calendar(start: str = CALENDAR_START, end: str = None) -> pd.DataFrame:
+    """
+    Precomputed trading days of the NYSE. The result is cached, so all
+    callers share the same frame and must not modify it.
+
+    Columns:
+        week: bucket id of the trading week, continuous over year ends
+        opex: quarterly option expiration (triple witching)
+        session: running number of the trading day
+
+    Args:
+        start (str, optional): first date. Defaults to CALENDAR_START.
+        end (str, optional): last date. Defaults to the end of next year.
+
+    Returns:
+        pd.DataFrame: calendar indexed by trading day
+    """
+    holidays = nyse_holidays(start, end)
+    days = pd.date_range(
+        start=start,
+        end=end if end else _calendar_end(),
+        freq=CustomBusinessDay(holidays=holidays),
+        name="Date",
+    )
+
+    # third friday of the quarter end months, if closed the day before
+    third_friday = pd.date_range(
+        start=start, end=days[-1], freq="WOM-3FRI", name="Date"
+    )
+    third_friday = third_friday[third_friday.month % 3 == 0]
+    opex = days[np.searchsorted(days, third_friday, side="right") - 1]
+
+    return pd.DataFrame(
+        {
+            "week": week_bucket(days),
+            "opex": days.isin(opex),
+            "session": np.arange(len(days)),
+        },
+        index=days,
+    )
+
+
+def option_expiration_days() -> pd.DatetimeIndex:
+    """Quarterly option expiration days (triple witching) of the calendar"""
+    cal = trading_calendar()
+    return cal.index[cal.opex]
+
+
+def week_bucket(index: pd.DatetimeIndex) -> np.ndarray:
+    """
+    Trading week id for each date of the index. The id counts the weeks
+    since the first monday of the epoch, so a week never splits at the
+    turn of the year like "%y-%W" does.
+    """
+    return ((index.normalize() - pd.Timestamp("1970-01-05")).days // 7).to_numpy()
+
+
+def shift_sessions(dates, sessions: int) -> pd.DatetimeIndex:
+    """
+    Move dates by a number of trading days. Dates which are not a trading
+    day are first moved to the next session.
+
+    Args:
+        dates: single date or list of dates
+        sessions (int): number of trading days, negative to go back
+
+    Returns:
+        pd.DatetimeIndex: shifted trading days
+    """
+    cal = trading_calendar()
+    session = cal.session.reindex(
+        pd.DatetimeIndex(np.atleast_1d(dates)), method="bfill"
+    ).fillna(len(cal) - 1)
+    pos = np.clip(session.to_numpy(dtype=int) + sessions, 0, len(cal) - 1)
+    return cal.index[pos]
+
+
+def align(
+    dfs: Dict[str, pd.DataFrame], column: str = "Close", sessions: int = None
+) -> pd.DataFrame:
+    """
+    Align one column of all symbols onto the common trading calendar.
+
+    Args:
+        dfs (Dict[str, pd.DataFrame]): stock data by symbol
+        column (str, optional): column to align. Defaults to "Close".
+        sessions (int, optional): only the trailing trading days up to the
+            last bar of all symbols. Defaults to None for the whole history.
+
+    Returns:
+        pd.DataFrame: trading days x symbols, NaN where no bar exists
+    """
+    start = None
+    if sessions:
+        last = max(df.index[-1] for df in dfs.values())
+        start = shift_sessions(last, 1 - sessions)[0]
+    panel = pd.concat(
+        {symbol: df[column][start:] for symbol, df in dfs.items()}, axis=1
+    )
+    days = trading_calendar().index
+    days = days[(days >= panel.index.min()) & (days <= panel.index.max())]
+    return panel.reindex(days)
+
+
+def missing_bars(panel: pd.DataFrame) -> pd.DataFrame:
+    """
+    Trading days without a bar between the first and last bar of a symbol.
+
+    Args:
+        panel (pd.DataFrame): aligned data of align()
+
+    Returns:
+        pd.DataFrame: True where a bar is missing
+    """
+    present = panel.notna()
+    started = present.cummax()
+    not_ended = present[::-1].cummax()[::-1]
+    return ~present & started & not_ended
@@ -0,0 +1,142 @@
+"""Validation and Quarantine of downloaded Stock Data"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+# checks which drop single bars
+BAR_CHECKS = ["zero_range", "ohlc", "zero_volume", "stale"]
+# checks which quarantine the whole symbol
+JUMP_CHECKS = ["spike", "split"]
+# checks which are only reported
+WARN_CHECKS = ["outlier_gap"]
+
+# trading days of each symbol, which are checked for quarantine
+LOOKBACK: int = 20
+# unadjusted splits are checked over the indicator history of the screener
+SPLIT_LOOKBACK: int = 200
+
+# close to close move in log, which is reverted by the next bar
+SPIKE_LIMIT: float = np.log(1.3)
+SPIKE_REVERT: float = np.log(1.05)
+# distance in log between the move and the split reported by yahoo
+SPLIT_TOLERANCE: float = 0.03
+# open to previous close in log, about a factor of two
+OUTLIER_GAP: float = np.log(2)
+# share of dropped bars, which quarantines the symbol
+MAX_BAD_SHARE: float = 0.2
+
+
+def stack_bars(stock_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    Bring a download of yahoo, grouped by ticker, into one long frame.
+    Missing bars are dropped.
+
+    Args:
+        stock_data (pd.DataFrame): download of yahoo
+
+    Returns:
+        pd.DataFrame: bars indexed by symbol and Date
+    """
+    bars = stock_data.stack(level=0, future_stack=True).swaplevel().sort_index()
+    bars.index = bars.index.set_names(["symbol", "Date"])
+    bars.index = bars.index.set_levels(bars.index.levels[0].str.lower(), level=0)
+    bars.columns.name = None
+    return bars[bars[FIELDS].notna().all(axis=1)]
+
+
+def validate_bars(
+    bars: pd.DataFrame, lookback: int = LOOKBACK
+) -> Tuple[Dict[str, pd.DataFrame], pd.DataFrame, pd.Series]:
+    """
+    Validate the bars of all symbols at once. Bars with zero range,
+    inconsistent OHLC, zero volume or a stale copy of the previous bar are
+    dropped and counted. A symbol is quarantined, if its last bars contain a
+    bad tick or too many dropped bars, or if an unadjusted split is part of
+    the last SPLIT_LOOKBACK bars, which the indicators are based on. Outlier
+    gaps are only reported. A quarantine for a bad tick or dropped bars
+    clears once they are older than the lookback, for a split once it left
+    the indicator history.
+
+    An unadjusted split needs the "Stock Splits" column of a download with
+    actions=True and a move of the close by the reported ratio.
+
+    Args:
+        bars (pd.DataFrame): result of stack_bars()
+        lookback (int, optional): checked bars of each symbol. Defaults to LOOKBACK.
+
+    Returns:
+        Tuple[Dict[str, pd.DataFrame], pd.DataFrame, pd.Series]: stock data
+            by symbol without the dropped bars, the findings of the checked
+            bars with counts, reason and whether the symbol is quarantined,
+            and the failed checks of every flagged bar by symbol and Date
+    """
+
+    prev = bars.groupby(level="symbol").shift(1)
+
+    checks = pd.DataFrame(index=bars.index)
+    checks["zero_range"] = bars.High == bars.Low
+    checks["ohlc"] = (
+        (bars.High < bars[["Open", "Close", "Low"]].max(axis=1))
+        | (bars.Low > bars[["Open", "Close"]].min(axis=1))
+        | (bars.Low <= 0)
+    )
+    checks["zero_volume"] = bars.Volume == 0
+    checks["stale"] = (bars[FIELDS] == prev[FIELDS]).all(axis=1)
+    bad = checks[BAR_CHECKS].any(axis=1)
+
+    # jumps are measured between the remaining bars only
+    clean = bars[~bad]
+    prev_close = clean.Close.groupby(level="symbol").shift(1)
+    move = np.log(clean.Close / prev_close)
+    next_move = move.groupby(level="symbol").shift(-1)
+    gap = np.log(clean.Open / prev_close)
+
+    spike = (move.abs() > SPIKE_LIMIT) & ((move + next_move).abs() < SPIKE_REVERT)
+    # the bar reverting a bad tick is no jump of its own
+    spike = spike | spike.groupby(level="symbol").shift(1, fill_value=False)
+
+    # a forward split of 2 halves the close, if yahoo did not adjust it
+    split = pd.Series(False, index=clean.index)
+    if "Stock Splits" in clean:
+        ratio = clean["Stock Splits"].where(clean["Stock Splits"] > 0)
+        split = (move + np.log(ratio)).abs() < SPLIT_TOLERANCE
+
+    checks["spike"] = spike.reindex(bars.index, fill_value=False)
+    checks["split"] = split.reindex(bars.index, fill_value=False)
+    checks["outlier_gap"] = (
+        (gap.abs() > OUTLIER_GAP) & ~spike & ~split
+    ).reindex(bars.index, fill_value=False)
+
+    # counts per symbol over the last bars, a dropped bar is counted once
+    age = bars.groupby(level="symbol").cumcount(ascending=False)
+    recent = checks[age < lookback]
+    counts = recent.groupby(level="symbol").sum()
+    counts["bars"] = recent.groupby(level="symbol").size()
+    counts["bad_bars"] = bad[age < lookback].groupby(level="symbol").sum()
+    counts["split"] = (
+        checks.split[age < SPLIT_LOOKBACK]
+        .groupby(level="symbol")
+        .sum()
+        .reindex(counts.index, fill_value=0)
+    )
+
+    failed = counts[JUMP_CHECKS] > 0
+    failed["bad_bars"] = counts.bad_bars > MAX_BAD_SHARE * counts.bars
+    found = failed.join(counts[WARN_CHECKS] > 0)
+
+    findings = counts.assign(
+        reason=found.dot(found.columns + ", ").str.rstrip(", "),
+        quarantined=failed.any(axis=1),
+    )[found.any(axis=1)]
+
+    flagged = checks[checks.any(axis=1)]
+    issues = flagged.dot(flagged.columns + ", ").str.rstrip(", ")
+
+    dfs = {
+        symbol: df.droplevel("symbol") for symbol, df in clean.groupby(level="symbol")
+    }
+    return dfs, findings, issues